@@ -3,13 +3,15 @@ import os
 import json
 import time
 import threading
-import random
 import customtkinter as ctk
 from tkinter import messagebox
 from PIL import Image, ImageTk
 import serial.tools.list_ports
 from openai import OpenAI
 import queue
+import re
+from collections import deque
+from nucleo import conectar_nucleo, RegistroReles, PORTA_ERRO, PULSO_MAX
 
 # ----------------- Config -----------------
 CTK_BG = "#0f2610"
@@ -22,6 +24,13 @@ PASTA_IMAGENS = "plantas"     # pasta com frio.png, calor.png, seco.png, arseco.
 ARQ_PAISES = "paises.json"
 ARQ_PLANTAS = "plantas.json"
 
+TOKENS_CONTEXTO = 1800        # orçamento aproximado de tokens por pedido ao assistente
+TOKENS_RESUMO = 300           # parte do orçamento reservada ao resumo da conversa antiga
+TOKENS_PERGUNTA = 400         # parte reservada à última mensagem (estado da estufa + pergunta)
+JANELA_LEITURAS = 300         # leituras (1 por segundo) usadas nas estatísticas do assistente
+NOMES_RELES = {7: "aquecimento", 9: "umidificador", 10: "irrigação", 11: "coolers"}
+INTERVALO_ESTADO_MS = 250     # frequência com que a interface lê o estado publicado pelo núcleo
+
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("green")
 
@@ -39,28 +48,137 @@ def salvar_json(path, data):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4, ensure_ascii=False)
 
-# ----------------- Arduino Simulado -----------------
-class ArduinoSim:
-    """Simula leituras de solo e um relé na porta 10"""
-    def __init__(self):
-        # valores 0..1023 simulados (seco > 700, ideal 350-700, úmido < 350)
-        self.solo = [800, 800, 800]
-        self.pino10 = False
-
-    def ler_solo(self):
-        # pequena oscilação natural
-        self.solo = [max(0, min(1023, int(v + random.uniform(-5, 5)))) for v in self.solo]
-        # solo seca lentamente
-        if not self.pino10:
-            self.solo = [min(1023, v + 0.1) for v in self.solo]
-        return self.solo
-
-    def irrigar_solo(self):
-        # irrigação torna o solo mais úmido (valor diminui)
-        self.solo = [max(0, v - 5) for v in self.solo]
-
-    def set_pino10(self, estado):
-        self.pino10 = bool(estado)
+# ----------------- Contexto do Assistente -----------------
+PROMPT_ASSISTENTE = (
+    "Você é um agricultor profissional com 30 anos de experiência. "
+    "Responda como um especialista real, sem exageros ou dramatização. "
+    "Se a pergunta for simples (ex.: 'Como plantar batata?'), dê uma resposta prática. "
+    "Se for complexa (ex.: 'Como controlar pragas organicamente?'), explique com detalhes técnicos. "
+    "Mantenha um tom natural, direto e baseado em fatos reais da agricultura."
+    "Não comente mais sobre os comandos anteriores."
+    "Responda da forma mais rápida possivel sem ficar pensando demais."
+)
+
+def estimar_tokens(texto):
+    # aproximação: ~4 caracteres por token, suficiente para controlar o orçamento
+    return len(texto) // 4 + 1
+
+def encurtar(texto, limite=140):
+    texto = " ".join(texto.split())
+    if len(texto) <= limite:
+        return texto
+    return texto[:limite].rsplit(" ", 1)[0] + "…"
+
+def cortar(texto, limite):
+    # corta sem mexer nas quebras de linha (usado no estado e na pergunta)
+    if len(texto) <= limite:
+        return texto
+    return texto[:max(0, limite - 1)] + "…"
+
+def resumir_estado(planta, leituras, reles, nucleo_ativo=True):
+    """Texto compacto com a faixa da planta, estatísticas recentes dos sensores e relés ligados"""
+    fmt = lambda v: f"{v:g}" if isinstance(v, (int, float)) else "?"
+    linhas = []
+    if planta:
+        linhas.append(
+            f"Planta: {planta.get('nome', '?')} (temp {fmt(planta.get('temp_min'))}-{fmt(planta.get('temp_max'))} °C, "
+            f"umidade {fmt(planta.get('umidade_min'))}-{fmt(planta.get('umidade_max'))} %)"
+        )
+    if leituras:
+        for nome, i, unid in (("Temperatura", 0, " °C"), ("Umidade do ar", 1, " %"), ("Solo (0-1023, seco > 700)", 2, "")):
+            vals = [l[i] for l in leituras]
+            linhas.append(f"{nome}: atual {vals[-1]:.1f}{unid}, média {sum(vals) / len(vals):.1f}, "
+                          f"mín {min(vals):.1f}, máx {max(vals):.1f} (últimos {len(vals)} s)")
+    if not nucleo_ativo:
+        linhas.append("Atenção: o controle da estufa está parado; não há leituras atuais nem estado dos atuadores.")
+        return "\n".join(linhas)
+    ligados = [NOMES_RELES[p] for p, on in sorted(reles.items()) if on and p in NOMES_RELES]
+    linhas.append("Atuadores ligados: " + (", ".join(ligados) if ligados else "nenhum"))
+    return "\n".join(linhas)
+
+def resumir_troca(pergunta, resposta, limite=200):
+    """Linha do resumo: a pergunta e as frases da resposta com mais fatos.
+
+    Frases com números ou com palavras da pergunta valem mais; assim a introdução
+    genérica da resposta raramente entra no resumo.
+    """
+    termos = {w.lower() for w in re.findall(r"\w{4,}", pergunta)}
+    frases = [f.strip(" -*•\t") for f in re.split(r"(?<=[.!?])\s+|\n+", resposta) if f.strip(" -*•\t")]
+    def nota(item):
+        i, frase = item
+        palavras = {w.lower() for w in re.findall(r"\w{4,}", frase)}
+        return (2 * bool(re.search(r"\d", frase)) + len(termos & palavras), -i)
+    escolhidas = sorted(sorted(enumerate(frases), key=nota, reverse=True)[:2])
+    fatos = " ".join(frase for _, frase in escolhidas)
+    return f"- P: {encurtar(pergunta, 80)} | R: {encurtar(fatos, limite)}"
+
+CABECALHO_RESUMO = "Resumo da conversa anterior:\n"
+MODELO_PERGUNTA = "Estado atual da estufa:\n{}\n\nPergunta: {}"
+
+class ContextoAssistente:
+    """Monta as mensagens do assistente dentro de um orçamento fixo de tokens.
+
+    A ordem é sempre: prompt fixo, resumo das trocas antigas, trocas recentes e, por último,
+    o estado da estufa junto da pergunta. O resumo só cresce no fim, então quando trocas
+    antigas são resumidas o prompt e o resumo anterior continuam iguais e o servidor local
+    reaproveita esse prefixo. A compactação roda em registrar, depois que a resposta já foi
+    exibida, e não no caminho do pedido.
+    """
+    def __init__(self, prompt=PROMPT_ASSISTENTE, orcamento=TOKENS_CONTEXTO,
+                 orcamento_resumo=TOKENS_RESUMO, orcamento_pergunta=TOKENS_PERGUNTA):
+        self.msg_sistema = {"role": "system", "content": prompt}
+        self.orcamento_resumo = orcamento_resumo
+        self.orcamento_pergunta = orcamento_pergunta
+        self.orcamento_turnos = max(0, orcamento - estimar_tokens(prompt) - estimar_tokens(CABECALHO_RESUMO)
+                                    - orcamento_resumo - orcamento_pergunta)
+        self.resumo = []              # uma linha por troca antiga, sempre acrescentada no fim
+        self.tokens_resumo = 0
+        self.turnos = deque()         # (pergunta, resposta, tokens)
+        self.tokens_turnos = 0
+        self.lock = threading.Lock()
+
+    def registrar(self, pergunta, resposta):
+        with self.lock:
+            t = estimar_tokens(pergunta) + estimar_tokens(resposta)
+            self.turnos.append((pergunta, resposta, t))
+            self.tokens_turnos += t
+            if self.tokens_turnos > self.orcamento_turnos:
+                self._compactar()
+
+    def montar(self, pergunta, estado=""):
+        final = self._ultima_mensagem(pergunta, estado, self.orcamento_pergunta)
+        with self.lock:
+            msgs = [self.msg_sistema]
+            if self.resumo:
+                msgs.append({"role": "system", "content": CABECALHO_RESUMO + "\n".join(self.resumo)})
+            for p, r, _ in self.turnos:
+                msgs += [{"role": "user", "content": p}, {"role": "assistant", "content": r}]
+        msgs.append({"role": "user", "content": final})
+        return msgs
+
+    def _ultima_mensagem(self, pergunta, estado, max_tokens):
+        # a última mensagem também respeita o orçamento: a pergunta fica com a maior parte
+        # e o estado com o que sobrar (limite em caracteres é o inverso de estimar_tokens)
+        limite = max(0, (max_tokens - 1) * 4)
+        if not estado:
+            return cortar(pergunta, limite)
+        livre = max(0, limite - len(MODELO_PERGUNTA.format("", "")))
+        pergunta = cortar(pergunta, livre - min(len(estado), livre // 3))
+        return MODELO_PERGUNTA.format(cortar(estado, livre - len(pergunta)), pergunta)
+
+    def _compactar(self):
+        # resume até metade do espaço das trocas recentes, para a próxima compactação demorar
+        while self.turnos and self.tokens_turnos > self.orcamento_turnos // 2:
+            pergunta, resposta, t = self.turnos.popleft()
+            self.tokens_turnos -= t
+            linha = resumir_troca(pergunta, resposta)
+            self.resumo.append(linha)
+            self.tokens_resumo += estimar_tokens(linha) + 1
+        if self.tokens_resumo > self.orcamento_resumo:
+            # resumo cheio: descarta de uma vez as linhas mais antigas até a metade do orçamento,
+            # o único caso em que o início do resumo muda
+            while self.resumo and self.tokens_resumo > self.orcamento_resumo // 2:
+                self.tokens_resumo -= estimar_tokens(self.resumo.pop(0)) + 1
 
 
 # ----------------- Tela Assistente -----------------
@@ -79,6 +197,7 @@ class TelaAssistente(ctk.CTkFrame):
         self.janela_pensamento = None
         self.caixa_pensamento = None
         self.typing_queue = queue.Queue()
+        self.contexto = ContextoAssistente()
 
         # Interface
         ctk.CTkLabel(self, text="🤖 Assistente Pessoal", font=("Arial", 22, "bold"), text_color=CTK_TEXT).pack(pady=12)
@@ -143,21 +262,7 @@ class TelaAssistente(ctk.CTkFrame):
         try:
             response = self.client.chat.completions.create(
                 model="deepseek-r1:8b",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "Você é um agricultor profissional com 30 anos de experiência. "
-                            "Responda como um especialista real, sem exageros ou dramatização. "
-                            "Se a pergunta for simples (ex.: 'Como plantar batata?'), dê uma resposta prática. "
-                            "Se for complexa (ex.: 'Como controlar pragas organicamente?'), explique com detalhes técnicos. "
-                            "Mantenha um tom natural, direto e baseado em fatos reais da agricultura."
-                            "Não comente mais sobre os comandos anteriores."
-                            "Responda da forma mais rápida possivel sem ficar pensando demais."
-                        )
-                    },
-                    {"role": "user", "content": user_msg}
-                ],
+                messages=self.contexto.montar(user_msg, self.master.resumo_estado()),
                 stream=True
             )
             pensando = False
@@ -181,6 +286,7 @@ class TelaAssistente(ctk.CTkFrame):
                         fala_buffer += parte
             if fala_buffer.strip():
                 self.typing_queue.put((fala_buffer, 'bot'))
+                self.contexto.registrar(user_msg, fala_buffer.strip())
         except Exception as e:
             error_msg = f"\n[Erro] Não foi possível conectar ao assistente. Verifique se o servidor local está rodando.\nDetalhes: {str(e)}\n"
             self.typing_queue.put((error_msg, 'bot'))
@@ -230,10 +336,15 @@ class App(ctk.CTk):
         self.geometry("900x620")
         self.configure(bg=CTK_BG)
 
-        # estado global
+        # estado global: espelho do que o núcleo (outro processo, ver nucleo.py) publica
+        try:
+            self.nucleo = conectar_nucleo()
+        except RuntimeError as e:
+            messagebox.showerror("Erro", str(e))
+            raise SystemExit(1)
         self.arduino_porta = None
-        self.ar_sim = ArduinoSim()
         self.simular_sem_arduino = True
+        self.nucleo_ativo = True
 
         self.plantas_db = carregar_json(ARQ_PLANTAS) or []
         self.paises_db = carregar_json(ARQ_PAISES) or {}
@@ -245,6 +356,7 @@ class App(ctk.CTk):
         self.loop_counter = 0
 
         self.relay_states = {7: False, 9: False, 10: False, 11: False}
+        self.leituras = deque(maxlen=JANELA_LEITURAS)  # (temperatura, umidade_ar, solo médio)
 
         # UI frames
         self.frame_porta = TelaPorta(self, self.conectar_arduino)
@@ -267,13 +379,19 @@ class App(ctk.CTk):
         self.btn_assistente.place(relx=0.98, rely=0.98, anchor="se")
         self.btn_assistente.lift()
 
+        # aviso exibido quando o núcleo para de publicar o pulso
+        self.aviso_nucleo = ctk.CTkFrame(self, fg_color="#5a1f1f", corner_radius=0)
+        ctk.CTkLabel(self.aviso_nucleo, text="⚠️ Núcleo de controle parado - leituras desatualizadas",
+                     text_color=CTK_TEXT).pack(side="left", padx=10, pady=6)
+        ctk.CTkButton(self.aviso_nucleo, text="🔄 Reiniciar núcleo", command=self.reiniciar_nucleo,
+                      fg_color=CTK_BTN, hover_color=CTK_HOVER).pack(side="right", padx=10, pady=6)
+
         self.bind_all('<Control-Key-f>', lambda e: self.process_cmd("F"))
         self.bind_all('<Control-Key-c>', lambda e: self.process_cmd("C"))
         self.bind_all('<Control-Key-s>', lambda e: self.process_cmd("S"))
         self.bind_all('<Control-Key-n>', lambda e: self.process_cmd("N"))
 
-        self.running = True
-        threading.Thread(target=self.loop_simulacao, daemon=True).start()
+        self.atualizar_estado()
 
     def slide_to(self, frame_from, frame_to, speed=0.03):
         if not frame_from or not frame_to: return
@@ -294,16 +412,25 @@ class App(ctk.CTk):
         mover()
 
     def conectar_arduino(self, porta):
-        if porta is None or "simul" in porta.lower():
-            self.simular_sem_arduino = True
-        else:
-            try:
-                import serial
-                self.serial = serial.Serial(porta, 9600, timeout=1)
-                self.simular_sem_arduino = False
-            except Exception as e:
-                messagebox.showerror("Erro Serial", f"Não foi possível abrir a porta serial {porta}.\nUsando modo de simulação.\n\nErro: {e}")
-                self.simular_sem_arduino = True
+        # a porta serial é aberta pelo núcleo; espera a resposta sem travar a interface
+        estado = self.nucleo.ler()
+        if estado is None or not self.nucleo.enviar_porta(porta):
+            messagebox.showerror("Erro", "O núcleo de controle não respondeu. Tente novamente.")
+            return
+        self.arduino_porta = porta
+        self.after(100, self._aguardar_porta, porta, estado["seq_porta"], 50)
+
+    def _aguardar_porta(self, porta, seq, tentativas):
+        estado = self.nucleo.ler()
+        if estado is None or estado["seq_porta"] == seq:
+            if tentativas > 0:
+                self.after(100, self._aguardar_porta, porta, seq, tentativas - 1)
+            else:
+                messagebox.showerror("Erro", f"O núcleo de controle não confirmou a porta {porta}. Tente novamente.")
+            return
+        self.simular_sem_arduino = estado["simular"]
+        if estado["status_porta"] == PORTA_ERRO:
+            messagebox.showerror("Erro Serial", f"Não foi possível abrir a porta serial {porta}.\nUsando modo de simulação.\n\nErro: {estado['erro_porta']}")
         self.slide_to(self.frame_porta, self.frame_selecao)
 
     def ir_para_adicionar(self):
@@ -346,12 +473,14 @@ class App(ctk.CTk):
         if not planta: print("[segredo] sem planta selecionada"); return
         
         p = planta
-        if cmd == "F": self.temperatura = p["temp_min"] - 1.3
-        elif cmd == "C": self.temperatura = p["temp_max"] + 1.1
-        elif cmd == "S": self.umidade_ar = max(0.0, p["umidade_min"] - 2.6)
+        enviado = True
+        if cmd == "F": enviado = self.nucleo.enviar_valores(temperatura=p["temp_min"] - 1.3)
+        elif cmd == "C": enviado = self.nucleo.enviar_valores(temperatura=p["temp_max"] + 1.1)
+        elif cmd == "S": enviado = self.nucleo.enviar_valores(umidade_ar=max(0.0, p["umidade_min"] - 2.6))
         elif cmd == "N":
-            self.temperatura = (p["temp_min"] + p["temp_max"]) / 2.0
-            self.umidade_ar = (p["umidade_min"] + p["umidade_max"]) / 2.0
+            enviado = self.nucleo.enviar_valores((p["temp_min"] + p["temp_max"]) / 2.0,
+                                                 (p["umidade_min"] + p["umidade_max"]) / 2.0)
+        if not enviado: print(f"[segredo] {cmd} não enviado: núcleo não respondeu"); return
         
         print(f"[segredo] {cmd} aplicado")
         if self.frame_tamagotchi and self.frame_tamagotchi.winfo_exists():
@@ -359,37 +488,34 @@ class App(ctk.CTk):
             if image_key: self.frame_tamagotchi.force_image(image_key)
             if cmd == "N": self.frame_tamagotchi.clear_forced()
 
-    def loop_simulacao(self):
-        while self.running:
-            self.loop_counter += 1
-            modo_manual = self.frame_tamagotchi and self.frame_tamagotchi.winfo_exists() and self.frame_tamagotchi.any_manual_active()
-            
-            # --- Lógica de Metas (Manual vs. Automático) ---
-            if modo_manual:
-                if self.loop_counter % 3 == 0: # Aplica o efeito a cada 3 segundos
-                    t = self.frame_tamagotchi
-                    if t.ativo_aquecer: self.meta_temp += 0.1
-                    if t.ativo_resfriar: self.meta_temp -= 0.1
-                    if t.ativo_umidificar: self.meta_umid += 0.1
-                    if t.ativo_irrigar:
-                        self.meta_umid += 0.1
-                        self.ar_sim.irrigar_solo()
-            else: # modo automático
-                # Tende a voltar para o normal
-                self.meta_temp += (25.0 - self.meta_temp) * 0.01 + random.uniform(-0.02, 0.02)
-                self.meta_umid += (55.0 - self.meta_umid) * 0.01 + random.uniform(-0.05, 0.05)
-            
-            # Limites de metas
-            self.meta_temp = min(max(10.0, self.meta_temp), 40.0)
-            self.meta_umid = min(max(20.0, self.meta_umid), 90.0)
-            
-            # --- Simulação Física (Inércia) ---
-            self.temperatura += (self.meta_temp - self.temperatura) * 0.1 + random.uniform(-0.05, 0.05)
-            self.umidade_ar += (self.meta_umid - self.umidade_ar) * 0.1 + random.uniform(-0.1, 0.1)
-            
-            # Leitura de Sensores
-            if self.simular_sem_arduino: self.ar_sim.ler_solo()
-            
+    def enviar_manual(self, tamagotchi):
+        t = tamagotchi
+        if not self.nucleo.enviar_manual(t.ativo_aquecer, t.ativo_resfriar, t.ativo_umidificar, t.ativo_irrigar):
+            messagebox.showwarning("Aviso", "O núcleo de controle não recebeu o comando dos botões manuais.")
+
+    def atualizar_estado(self):
+        # só lê a memória compartilhada: o controle segue no núcleo mesmo com a interface ocupada
+        estado = self.nucleo.ler()
+        ativo = estado is not None and time.time() - estado["pulso"] < PULSO_MAX
+        if ativo != self.nucleo_ativo:
+            self.nucleo_ativo = ativo
+            if not ativo: self.leituras.clear()
+        if not ativo:
+            self.aviso_nucleo.place(relx=0, rely=0, relwidth=1)
+            self.aviso_nucleo.lift()
+            self.after(INTERVALO_ESTADO_MS, self.atualizar_estado)
+            return
+        self.aviso_nucleo.place_forget()
+
+        self.temperatura, self.umidade_ar = estado["temperatura"], estado["umidade_ar"]
+        self.meta_temp, self.meta_umid = estado["meta_temp"], estado["meta_umid"]
+        self.relay_states = estado["reles"]
+        self.simular_sem_arduino = estado["simular"]
+
+        if estado["ciclos"] != self.loop_counter:
+            self.loop_counter = estado["ciclos"]
+            self.leituras.append((self.temperatura, self.umidade_ar, sum(estado["solo"]) / len(estado["solo"])))
+
             # --- Atualização da UI ---
             try:
                 if self.frame_simulacao and self.frame_simulacao.winfo_exists():
@@ -397,11 +523,49 @@ class App(ctk.CTk):
                 if self.frame_tamagotchi and self.frame_tamagotchi.winfo_exists():
                     self.frame_tamagotchi.update_status(self.temperatura, self.umidade_ar)
             except Exception: pass
-            
-            time.sleep(1)
+
+        self.after(INTERVALO_ESTADO_MS, self.atualizar_estado)
+
+    def reiniciar_nucleo(self):
+        try:
+            novo = conectar_nucleo()
+        except RuntimeError as e:
+            messagebox.showerror("Erro", str(e))
+            return
+        self.nucleo.fechar()   # o núcleo novo já zerou a posse da fila
+        self.nucleo = novo
+        # o núcleo novo começa em simulação e sem botões manuais: reenvia o que a interface sabe
+        if self.arduino_porta and not self.nucleo.enviar_porta(self.arduino_porta):
+            messagebox.showwarning("Aviso", f"O núcleo reiniciou, mas não recebeu a porta {self.arduino_porta}.")
+        if self.frame_tamagotchi and self.frame_tamagotchi.winfo_exists(): self.enviar_manual(self.frame_tamagotchi)
+
+    def mostrar_uso_reles(self):
+        # só leitura: o núcleo continua sendo o único a gravar o log dos relés
+        registro = RegistroReles(somente_leitura=True)
+        # cada período começa à meia-noite, contando hoje: "7 dias" são hoje e os 6 anteriores
+        a, m, d = time.localtime()[:3]
+        meia_noite = lambda atras: time.mktime((a, m, d - atras, 0, 0, 0, 0, 0, -1))
+        totais = [(nome, registro.totais(meia_noite(atras))) for nome, atras in
+                  (("Hoje", 0), ("7 dias", 6), ("365 dias", 364))]
+        linhas = []
+        for pino, nome in NOMES_RELES.items():
+            linhas.append(f"{nome.capitalize()}:")
+            for periodo, tot in totais:
+                seg, n, wh = tot.get(pino, (0.0, 0, 0.0))
+                linhas.append(f"  {periodo}: {seg / 3600:.1f} h ligado, {n} acionamentos, {wh / 1000:.2f} kWh")
+        messagebox.showinfo("📊 Uso dos atuadores", "\n".join(linhas))
+
+    def resumo_estado(self):
+        planta = getattr(self.frame_simulacao, 'planta', None)
+        return resumir_estado(planta, list(self.leituras), dict(self.relay_states), self.nucleo_ativo)
 
     def on_close(self):
-        self.running = False
+        # fechar a janela encerra o núcleo; se a interface cair sem passar por aqui, ele continua
+        if not self.nucleo.enviar_sair() and self.nucleo.vivo():
+            messagebox.showwarning("Aviso", "O núcleo de controle não respondeu ao pedido para encerrar "
+                                   "e continua rodando em segundo plano.")
+        self.nucleo.liberar_fila()
+        self.nucleo.fechar()
         self.destroy()
 
 # ----------------- Tela Porta -----------------
@@ -549,6 +713,7 @@ class TelaSimulacao(ctk.CTkFrame):
         self.lbl_umid.pack(pady=5)
 
         ctk.CTkButton(self, text="Ir para Tamagotchi 🌱", command=lambda: abrir_tamagotchi_cb(self.planta), fg_color=CTK_BTN, hover_color=CTK_HOVER).pack(pady=12)
+        ctk.CTkButton(self, text="📊 Uso dos atuadores", command=master.mostrar_uso_reles, fg_color=CTK_BTN, hover_color=CTK_HOVER).pack(pady=8)
         ctk.CTkButton(self, text="Voltar para seleção", command=voltar_cb, fg_color=CTK_BTN, hover_color=CTK_HOVER).pack(pady=8)
         
         self.update_display(master.temperatura, master.umidade_ar)
@@ -683,6 +848,7 @@ class TelaTamagotchi(ctk.CTkFrame):
         states = {"Aquecer": self.ativo_aquecer, "Resfriar": self.ativo_resfriar, "Umidificar": self.ativo_umidificar, "Irrigar": self.ativo_irrigar}
         for name, active in states.items():
             self.buttons[name].configure(fg_color="#60a060" if active else CTK_BTN, hover_color=CTK_HOVER)
+        self.master.enviar_manual(self)
 
 # ----------------- Run -----------------
 if __name__ == "__main__":
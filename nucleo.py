@@ -0,0 +1,757 @@
+# nucleo.py
+# Núcleo de sensores e controle da estufa. Roda em um processo próprio (python nucleo.py),
+# separado da interface: publica o estado em memória compartilhada e recebe comandos por
+# uma fila na mesma memória. Se a interface travar ou fechar sem aviso, a estufa continua
+# sendo controlada e uma nova interface pode se anexar de novo.
+import os
+import sys
+import json
+import math
+import time
+import random
+import signal
+import struct
+import tempfile
+import threading
+import subprocess
+from multiprocessing import shared_memory
+
+# ----------------- Config -----------------
+NOME_MEMORIA = "estufa_inteligente"
+ARQ_LOG_NUCLEO = "nucleo.log"
+ARQ_TRAVA_NUCLEO = "nucleo.pid"   # pid do núcleo em execução, travado enquanto ele vive
+# travado pela interface dona da fila; fica na pasta temporária porque a memória também é global
+ARQ_TRAVA_INTERFACE = os.path.join(tempfile.gettempdir(), NOME_MEMORIA + "_interface.lock")
+PINOS_RELES = (7, 9, 10, 11)
+COMANDOS_RELES = {7: "TEMP_BAIXA", 9: "UMID", 10: "IRRIGACAO", 11: "TEMP_ALTA"}   # ver estufa.cpp
+POTENCIA_RELES = {7: 60.0, 9: 25.0, 10: 20.0, 11: 12.0}   # potência estimada (W) de cada atuador
+
+ARQ_EVENTOS_RELES = "reles.bin"               # log binário das transições liga/desliga
+ARQ_AGREGADOS_RELES = "reles_agregados.jsonl" # tempo ligado e acionamentos por hora/dia (só o que mudou)
+ARQ_PULSO_RELES = "reles_pulso.bin"           # último instante em que o núcleo estava vivo
+
+INTERVALO_CONTROLE = 1.0      # segundos entre passos da simulação/controle
+INTERVALO_COMANDOS = 0.02     # espera entre leituras da fila de comandos
+PULSO_MAX = 3.0               # sem pulso por mais que isso o núcleo é considerado parado
+MAX_LINHA_SERIAL = 256        # linha da serial maior que isso é lixo (placa errada, baud errado)
+
+# ----------------- Processos -----------------
+def _travar(f):
+    """Trava exclusiva e sem espera no arquivo aberto; False se outro processo já a tem.
+
+    A trava vale enquanto o arquivo estiver aberto e o sistema a solta se o processo morrer.
+    """
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(1 << 30)   # byte bem além dos dados: não bloqueia leitura nem escrita
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+def processo_vivo(pid):
+    if not 0 < pid < 2 ** 31: return False
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)   # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle: return False
+        codigo = ctypes.c_ulong()
+        ok = kernel32.GetExitCodeProcess(handle, ctypes.byref(codigo))
+        kernel32.CloseHandle(handle)
+        return bool(ok) and codigo.value == 259   # STILL_ACTIVE
+    try:
+        # núcleo iniciado por esta interface: recolhe o filho se ele já morreu (zumbi ainda responde ao kill)
+        if os.waitpid(pid, os.WNOHANG)[0] == pid: return False
+    except ChildProcessError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def encerrar_processo(pid, espera=3.0):
+    """Pede para o processo terminar e o mata se ele não obedecer; True quando ele não existe mais"""
+    for sinal in (signal.SIGTERM, getattr(signal, "SIGKILL", signal.SIGTERM)):
+        try:
+            os.kill(pid, sinal)
+        except OSError:
+            return not processo_vivo(pid)
+        limite = time.monotonic() + espera
+        while time.monotonic() < limite:
+            if not processo_vivo(pid): return True
+            time.sleep(0.05)
+    return False
+
+def _pid_travado():
+    """pid do núcleo que segura ARQ_TRAVA_NUCLEO, ou 0 se nenhum núcleo estiver rodando"""
+    with open(ARQ_TRAVA_NUCLEO, "a+", encoding="utf-8") as f:
+        if _travar(f): return 0
+        f.seek(0)
+        try:
+            return int(f.read().strip() or 0)
+        except ValueError:
+            return 0
+
+# ----------------- Arduino Simulado -----------------
+class ArduinoSim:
+    """Simula leituras de solo e um relé na porta 10"""
+    def __init__(self):
+        # valores 0..1023 simulados (seco > 700, ideal 350-700, úmido < 350)
+        self.solo = [800, 800, 800]
+        self.pino10 = False
+
+    def ler_solo(self):
+        # pequena oscilação natural
+        self.solo = [max(0, min(1023, int(v + random.uniform(-5, 5)))) for v in self.solo]
+        # solo seca lentamente
+        if not self.pino10:
+            self.solo = [min(1023, v + 0.1) for v in self.solo]
+        return self.solo
+
+    def irrigar_solo(self):
+        # irrigação torna o solo mais úmido (valor diminui)
+        self.solo = [max(0, v - 5) for v in self.solo]
+
+    def set_pino10(self, estado):
+        self.pino10 = bool(estado)
+
+
+# ----------------- Registro dos Relés -----------------
+EVENTO_RELE = struct.Struct("<dBB")   # timestamp, pino, estado -> 10 bytes por evento
+
+def _dia(t):
+    return time.strftime("%Y-%m-%d", time.localtime(t))
+
+def _meia_noite(t, dias=0):
+    # meia-noite local do dia de t, deslocada de alguns dias (mktime normaliza o dia do mês)
+    lt = time.localtime(t)
+    return time.mktime((lt.tm_year, lt.tm_mon, lt.tm_mday + dias, 0, 0, 0, 0, 0, -1))
+
+def _ler_pulso(path):
+    try:
+        with open(path, "rb") as f:
+            return struct.unpack("<d", f.read(8).ljust(8, b"\0"))[0]
+    except OSError:
+        return 0.0
+
+def _fatias_por_hora(inicio, fim):
+    # divide o intervalo [inicio, fim) nas horas cheias que ele atravessa
+    while inicio < fim:
+        hora = int(inicio // 3600)
+        corte = min(fim, (hora + 1) * 3600)
+        yield hora, corte - inicio
+        inicio = corte
+
+class RegistroReles:
+    """Log binário das transições dos relés com agregados por hora e por dia.
+
+    Os agregados são atualizados a cada evento. A cada hora só os períodos que mudaram
+    são acrescentados ao arquivo de agregados, junto com a posição já processada do log;
+    ao abrir, o arquivo é compactado e só a cauda ainda não agregada do log é relida.
+    Os relatórios nunca percorrem os eventos brutos.
+
+    Só o núcleo grava. Com somente_leitura=True (interface, relatórios) os arquivos não são
+    tocados e relés ainda abertos contam até o último pulso do núcleo.
+    """
+    def __init__(self, arq_eventos=ARQ_EVENTOS_RELES, arq_agregados=ARQ_AGREGADOS_RELES, arq_pulso=ARQ_PULSO_RELES,
+                 somente_leitura=False):
+        self.arq_eventos = arq_eventos
+        self.arq_agregados = arq_agregados
+        self.lock = threading.Lock()
+        self.horas = {}           # pino -> {hora (t // 3600): [segundos ligado, acionamentos]}
+        self.dias = {}            # pino -> {"AAAA-MM-DD": [segundos ligado, acionamentos]}
+        self.sujos = set()        # (pino, hora) alterados desde o último salvamento
+        self.ligado_desde = {}    # pino -> timestamp do último ON ainda aberto
+        self.posicao = 0
+        self.salvo_em = 0.0
+        self.somente_leitura = somente_leitura
+        self.ativo_ate = None     # None: relés abertos contam até agora
+        self.arq = self.pulso = None
+        if not somente_leitura:
+            # trava antes de ler: um segundo gravador truncaria e reescreveria o mesmo log
+            self.arq = open(self.arq_eventos, "ab")
+            if not _travar(self.arq):
+                self.arq.close()
+                raise RuntimeError(f"{arq_eventos} já está sendo gravado por outro núcleo.")
+        self._carregar()
+        ultimo_pulso = _ler_pulso(arq_pulso)
+        if somente_leitura:
+            self.ativo_ate = ultimo_pulso
+            return
+        self.pulso = open(arq_pulso, "r+b" if os.path.exists(arq_pulso) else "w+b")
+        # relés que ficaram ligados quando o núcleo morreu sem aviso: encerra no último pulso
+        for pino, desde in list(self.ligado_desde.items()):
+            self.registrar(pino, False, max(desde, self.salvo_em, ultimo_pulso))
+        self._compactar()
+
+    def _carregar(self):
+        registros = []
+        try:
+            with open(self.arq_agregados, "r", encoding="utf-8") as f:
+                for linha in f:
+                    try:
+                        registros.append(json.loads(linha))
+                    except ValueError:
+                        break   # linha gravada pela metade
+        except OSError:
+            pass
+        tamanho = os.path.getsize(self.arq_eventos) if os.path.exists(self.arq_eventos) else 0
+        for dados in registros:
+            if dados["posicao"] > tamanho: break
+            self.posicao, self.salvo_em = dados["posicao"], dados["salvo_em"]
+            for p, hs in dados["horas"].items():
+                self.horas.setdefault(int(p), {}).update((int(h), v) for h, v in hs.items())
+            for p, ds in dados["dias"].items():
+                self.dias.setdefault(int(p), {}).update(ds)
+            self.ligado_desde = {int(p): t for p, t in dados["ligado_desde"].items()}
+        if self.posicao == tamanho:
+            return
+        with open(self.arq_eventos, "rb" if self.somente_leitura else "r+b") as f:
+            f.seek(self.posicao)
+            cauda = f.read()
+            util = len(cauda) - len(cauda) % EVENTO_RELE.size
+            for t, pino, estado in EVENTO_RELE.iter_unpack(cauda[:util]):
+                self._aplicar(t, pino, estado)
+            self.posicao += util
+            if not self.somente_leitura:
+                f.truncate(self.posicao)   # descarta evento gravado pela metade
+
+    def _aplicar(self, t, pino, estado):
+        if estado:
+            if pino in self.ligado_desde: return
+            self.ligado_desde[pino] = t
+            hora = int(t // 3600)
+            self.horas.setdefault(pino, {}).setdefault(hora, [0.0, 0])[1] += 1
+            self.dias.setdefault(pino, {}).setdefault(_dia(t), [0.0, 0])[1] += 1
+            self.sujos.add((pino, hora))
+        else:
+            inicio = self.ligado_desde.pop(pino, None)
+            if inicio is None: return
+            for hora, seg in _fatias_por_hora(inicio, t):
+                self.horas.setdefault(pino, {}).setdefault(hora, [0.0, 0])[0] += seg
+                self.dias.setdefault(pino, {}).setdefault(_dia(hora * 3600), [0.0, 0])[0] += seg
+                self.sujos.add((pino, hora))
+
+    def registrar(self, pino, estado, t=None):
+        t = time.time() if t is None else t
+        estado = bool(estado)
+        with self.lock:
+            if self.somente_leitura or self.arq.closed or estado == (pino in self.ligado_desde): return
+            self.arq.write(EVENTO_RELE.pack(t, pino, estado))
+            self.arq.flush()
+            self.posicao += EVENTO_RELE.size
+            self._aplicar(t, pino, estado)
+            if t - self.salvo_em >= 3600: self._salvar(t)
+
+    def marcar_pulso(self, t=None):
+        # 8 bytes sobrescritos a cada passo: diz até quando os relés abertos estavam de fato ligados
+        if self.somente_leitura or self.pulso.closed: return
+        self.pulso.seek(0)
+        self.pulso.write(struct.pack("<d", time.time() if t is None else t))
+        self.pulso.flush()
+
+    def _registro(self, t, sujos):
+        horas, dias = {}, {}
+        for pino, hora in sujos:
+            horas.setdefault(pino, {})[hora] = self.horas[pino][hora]
+            dia = _dia(hora * 3600)
+            dias.setdefault(pino, {})[dia] = self.dias[pino][dia]
+        return {"posicao": self.posicao, "salvo_em": t, "ligado_desde": self.ligado_desde, "horas": horas, "dias": dias}
+
+    def _salvar(self, t):
+        # acrescenta só os períodos alterados: o custo não cresce com o histórico
+        with open(self.arq_agregados, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self._registro(t, self.sujos), separators=(",", ":")) + "\n")
+        self.sujos = set()
+        self.salvo_em = t
+
+    def _compactar(self):
+        # reescreve o arquivo com um único registro completo (só na abertura, fora do controle)
+        with self.lock:
+            todos = {(p, h) for p, hs in self.horas.items() for h in hs}
+            tmp = self.arq_agregados + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps(self._registro(self.salvo_em, todos), separators=(",", ":")) + "\n")
+            os.replace(tmp, self.arq_agregados)
+            self.sujos = set()
+
+    def relatorio(self, escala="dia", inicio=None, fim=None):
+        """{pino: [(período, segundos ligado, acionamentos, energia Wh), ...]} em ordem cronológica.
+
+        O período é o início da hora (timestamp) ou a data "AAAA-MM-DD"; relé ainda ligado conta até
+        agora (ou até o último pulso do núcleo, em modo somente leitura). A janela é alargada para
+        períodos inteiros: da hora (ou meia-noite) de inicio até o fim da hora (ou do dia) de fim,
+        tanto para os agregados quanto para o relé ainda ligado.
+        """
+        agora = time.time()
+        ate = agora if self.ativo_ate is None else min(agora, self.ativo_ate)
+        inicio = 0.0 if inicio is None else inicio
+        fim = agora if fim is None else fim
+        por_hora = escala == "hora"
+        chave = (lambda h: h * 3600) if por_hora else (lambda h: _dia(h * 3600))
+        if por_hora:
+            de, ate_fim = int(inicio // 3600) * 3600, int(fim // 3600) * 3600 + 3600
+            a, b = de, ate_fim - 3600
+        else:
+            de, ate_fim = _meia_noite(inicio), _meia_noite(fim, 1)
+            a, b = _dia(de), _dia(fim)
+        res = {}
+        with self.lock:
+            tabela = self.horas if por_hora else self.dias
+            for pino in sorted(set(tabela) | set(self.ligado_desde)):
+                periodos = {}
+                for k, (seg, n) in tabela.get(pino, {}).items():
+                    k = k * 3600 if por_hora else k
+                    if a <= k <= b: periodos[k] = [seg, n]
+                if pino in self.ligado_desde:
+                    for hora, seg in _fatias_por_hora(max(self.ligado_desde[pino], de), min(ate, ate_fim)):
+                        periodos.setdefault(chave(hora), [0.0, 0])[0] += seg
+                res[pino] = [(k, seg, n, seg / 3600 * POTENCIA_RELES.get(pino, 0.0))
+                             for k, (seg, n) in sorted(periodos.items())]
+        return res
+
+    def totais(self, inicio=None, fim=None):
+        """{pino: (segundos ligado, acionamentos, energia Wh)} somando os agregados diários"""
+        return {pino: (sum(p[1] for p in ps), sum(p[2] for p in ps), sum(p[3] for p in ps))
+                for pino, ps in self.relatorio("dia", inicio, fim).items()}
+
+    def fechar(self):
+        if self.somente_leitura: return
+        with self.lock:
+            self._salvar(time.time())
+            self.arq.close()
+            self.pulso.close()
+
+
+# ----------------- Memória Compartilhada -----------------
+# Layout do bloco:
+#   0    seq do seqlock (ímpar = escrita em andamento)
+#   8    estado publicado pelo núcleo
+#   192  pid da interface que é dona da fila (único produtor)
+#   240  pid do núcleo que criou o bloco
+#   256  cabeça da fila (avançada só pelo núcleo)
+#   320  cauda da fila (avançada só pela interface)
+#   384  FILA_SLOTS posições de SLOT bytes com os comandos
+SEQ = struct.Struct("<Q")
+ESTADO = struct.Struct("<8dQ4sBBI96s")
+OFF_ESTADO = 8
+OFF_PRODUTOR = 192
+OFF_NUCLEO = 240
+OFF_CABECA = 256
+OFF_CAUDA = 320
+OFF_FILA = 384
+SLOT = 64
+FILA_SLOTS = 64
+TAMANHO_MEMORIA = OFF_FILA + SLOT * FILA_SLOTS
+
+CMD_MANUAL, CMD_DEFINIR, CMD_PORTA, CMD_SAIR = 1, 2, 3, 4
+CMD_FLAGS = struct.Struct("<B4B")
+CMD_VALORES = struct.Struct("<Bdd")
+CMD_TEXTO = struct.Struct(f"<B{SLOT - 1}s")
+
+PORTA_SIMULADA, PORTA_SERIAL, PORTA_ERRO = 0, 1, 2
+
+_trava_interface = None   # arquivo de ARQ_TRAVA_INTERFACE aberto e travado por esta interface
+
+class MemoriaEstufa:
+    """Bloco de memória compartilhada entre o núcleo e a interface.
+
+    O estado tem um único escritor (o núcleo) e é lido com seqlock: quem lê repete a leitura
+    se o contador mudou no meio. A fila de comandos é circular com um produtor (a thread do Tk)
+    e um consumidor (o núcleo); cada lado só escreve o próprio índice, então não há trava.
+    """
+    def __init__(self, shm, dono=False):
+        self.shm = shm
+        self.buf = shm.buf
+        self.dono = dono
+        self.seq = SEQ.unpack_from(self.buf, 0)[0]
+
+    @staticmethod
+    def _abrir(**kwargs):
+        # sem rastreio: o rastreador apagaria o bloco quando a interface fechasse ou, se o núcleo
+        # fosse morto, depois que o núcleo seguinte já o tivesse recriado; quem apaga é o núcleo
+        try:
+            return shared_memory.SharedMemory(name=NOME_MEMORIA, track=False, **kwargs)
+        except TypeError:
+            # Python < 3.13 não tem track: tira o bloco do rastreador à mão
+            shm = shared_memory.SharedMemory(name=NOME_MEMORIA, **kwargs)
+            if os.name == "posix":
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, "shared_memory")
+            return shm
+
+    @classmethod
+    def criar(cls):
+        try:
+            shm = cls._abrir(create=True, size=TAMANHO_MEMORIA)
+        except FileExistsError:
+            # sobra de um núcleo que morreu sem limpar: reaproveita o bloco, nunca o de um núcleo vivo
+            shm = cls._abrir()
+            pid = SEQ.unpack_from(shm.buf, OFF_NUCLEO)[0]
+            if pid != os.getpid() and processo_vivo(pid):
+                shm.close()
+                raise RuntimeError(f"A memória compartilhada ainda pertence ao núcleo {pid}.")
+            shm.buf[:TAMANHO_MEMORIA] = bytes(TAMANHO_MEMORIA)
+        SEQ.pack_into(shm.buf, OFF_NUCLEO, os.getpid())
+        return cls(shm, dono=True)
+
+    @classmethod
+    def anexar(cls):
+        try:
+            shm = cls._abrir()
+        except FileNotFoundError:
+            return None
+        return cls(shm)
+
+    def fechar(self):
+        self.buf = None
+        self.shm.close()
+        if self.dono:
+            try:
+                if os.name == "posix" and sys.version_info < (3, 13):
+                    # no Python antigo unlink também avisa o rastreador, que precisa conhecer o bloco
+                    from multiprocessing import resource_tracker
+                    resource_tracker.register(self.shm._name, "shared_memory")
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    # --- estado (seqlock) ---
+    def publicar(self, estado):
+        self.seq += 1
+        SEQ.pack_into(self.buf, 0, self.seq)
+        ESTADO.pack_into(
+            self.buf, OFF_ESTADO,
+            estado["temperatura"], estado["umidade_ar"], estado["meta_temp"], estado["meta_umid"],
+            *estado["solo"], time.time(), estado["ciclos"],
+            bytes(int(estado["reles"][p]) for p in PINOS_RELES),
+            int(estado["simular"]), estado["status_porta"], estado["seq_porta"],
+            estado["erro_porta"].encode("utf-8")[:96]
+        )
+        self.seq += 1
+        SEQ.pack_into(self.buf, 0, self.seq)
+
+    def ler(self, espera=0.05):
+        """Estado publicado pelo núcleo, ou None se a escrita não termina (núcleo morreu no meio dela)"""
+        limite = time.monotonic() + espera
+        while True:
+            antes = SEQ.unpack_from(self.buf, 0)[0]
+            if not antes & 1:
+                campos = ESTADO.unpack_from(self.buf, OFF_ESTADO)
+                if SEQ.unpack_from(self.buf, 0)[0] == antes:
+                    break
+            if time.monotonic() > limite:
+                return None
+            time.sleep(0)
+        (temp, umid, meta_temp, meta_umid, s1, s2, s3, pulso, ciclos,
+         reles, simular, status_porta, seq_porta, erro) = campos
+        return {
+            "temperatura": temp, "umidade_ar": umid, "meta_temp": meta_temp, "meta_umid": meta_umid,
+            "solo": [s1, s2, s3], "pulso": pulso, "ciclos": ciclos,
+            "reles": {p: bool(v) for p, v in zip(PINOS_RELES, reles)},
+            "simular": bool(simular), "status_porta": status_porta, "seq_porta": seq_porta,
+            "erro_porta": erro.rstrip(b"\0").decode("utf-8", "ignore")
+        }
+
+    def vivo(self):
+        estado = self.ler()
+        return estado is not None and time.time() - estado["pulso"] < PULSO_MAX
+
+    # --- fila de comandos (um produtor, um consumidor) ---
+    def reservar_fila(self):
+        """Torna esta interface a única produtora da fila; False se outra interface estiver aberta.
+
+        A posse vem da trava de ARQ_TRAVA_INTERFACE, que é atômica e some se a interface morrer.
+        A trava é do processo: reiniciar o núcleo na mesma interface não a solta.
+        """
+        global _trava_interface
+        if _trava_interface is None:
+            trava = open(ARQ_TRAVA_INTERFACE, "a+", encoding="utf-8")
+            if not _travar(trava):
+                trava.close()
+                return False
+            _trava_interface = trava
+        SEQ.pack_into(self.buf, OFF_PRODUTOR, os.getpid())
+        return True
+
+    def dona_da_fila(self):
+        return SEQ.unpack_from(self.buf, OFF_PRODUTOR)[0] == os.getpid()
+
+    def liberar_fila(self):
+        global _trava_interface
+        if self.dona_da_fila():
+            SEQ.pack_into(self.buf, OFF_PRODUTOR, 0)
+        if _trava_interface is not None:
+            _trava_interface.close()
+            _trava_interface = None
+
+    def enviar(self, dados, espera=0.5):
+        """Coloca um comando na fila; False se ela continuar cheia ou se outra interface for a dona"""
+        if not self.dona_da_fila():
+            return False
+        limite = time.monotonic() + espera
+        cauda = SEQ.unpack_from(self.buf, OFF_CAUDA)[0]
+        while cauda - SEQ.unpack_from(self.buf, OFF_CABECA)[0] >= FILA_SLOTS:
+            if time.monotonic() > limite:
+                return False
+            time.sleep(INTERVALO_COMANDOS / 4)
+        off = OFF_FILA + (cauda % FILA_SLOTS) * SLOT
+        self.buf[off:off + SLOT] = dados.ljust(SLOT, b"\0")
+        SEQ.pack_into(self.buf, OFF_CAUDA, cauda + 1)   # publica o slot só depois de escrito
+        return True
+
+    def receber(self):
+        cabeca = SEQ.unpack_from(self.buf, OFF_CABECA)[0]
+        if cabeca == SEQ.unpack_from(self.buf, OFF_CAUDA)[0]:
+            return None
+        off = OFF_FILA + (cabeca % FILA_SLOTS) * SLOT
+        dados = bytes(self.buf[off:off + SLOT])
+        SEQ.pack_into(self.buf, OFF_CABECA, cabeca + 1)
+        return dados
+
+    def enviar_manual(self, aquecer, resfriar, umidificar, irrigar):
+        return self.enviar(CMD_FLAGS.pack(CMD_MANUAL, aquecer, resfriar, umidificar, irrigar))
+
+    def enviar_valores(self, temperatura=None, umidade_ar=None):
+        nan = float("nan")
+        return self.enviar(CMD_VALORES.pack(CMD_DEFINIR, nan if temperatura is None else temperatura,
+                                            nan if umidade_ar is None else umidade_ar))
+
+    def enviar_porta(self, porta):
+        return self.enviar(CMD_TEXTO.pack(CMD_PORTA, (porta or "").encode("utf-8")))
+
+    def enviar_sair(self, espera=2.0):
+        return self.enviar(bytes([CMD_SAIR]), espera)
+
+
+def _reservar(memoria):
+    if memoria.reservar_fila():
+        return memoria
+    memoria.fechar()
+    raise RuntimeError("Outra interface já está conectada ao núcleo de controle.")
+
+def conectar_nucleo(timeout=10.0):
+    """Anexa ao núcleo em execução ou inicia um novo em segundo plano"""
+    memoria = MemoriaEstufa.anexar()
+    if memoria and memoria.vivo():
+        return _reservar(memoria)
+    if memoria: memoria.fechar()
+
+    # núcleo que ainda existe mas parou de publicar (preso na serial, suspenso): encerra antes de
+    # iniciar outro, senão os dois disputariam a memória, o log dos relés e a porta
+    pid = _pid_travado()
+    if pid and not encerrar_processo(pid):
+        raise RuntimeError(f"O núcleo de controle anterior (pid {pid}) parou de responder e não pôde ser encerrado.")
+
+    # sessão própria: o núcleo não morre junto com a interface nem com o terminal
+    with open(ARQ_LOG_NUCLEO, "a", encoding="utf-8") as log:
+        subprocess.Popen([sys.executable, os.path.abspath(__file__)], stdin=subprocess.DEVNULL,
+                         stdout=log, stderr=log, start_new_session=True)
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        time.sleep(0.1)
+        memoria = MemoriaEstufa.anexar()
+        if memoria and memoria.vivo():
+            return _reservar(memoria)
+        if memoria: memoria.fechar()
+    raise RuntimeError(f"O núcleo de controle não iniciou. Veja {ARQ_LOG_NUCLEO}.")
+
+
+# ----------------- Núcleo -----------------
+class NucleoEstufa:
+    """Simulação física, relés e porta serial; antes rodava em uma thread da interface"""
+    def __init__(self, memoria):
+        self.memoria = memoria
+        self.ar_sim = ArduinoSim()
+        self.registro_reles = RegistroReles()
+        self.serial = None
+        self.buffer_serial = b""
+        self.simular_sem_arduino = True
+        self.status_porta, self.seq_porta, self.erro_porta = PORTA_SIMULADA, 0, ""
+
+        self.temperatura = 25.0
+        self.umidade_ar = 55.0
+        self.meta_temp = 25.0
+        self.meta_umid = 55.0
+        self.solo = list(self.ar_sim.solo)
+        self.loop_counter = 0
+
+        self.relay_states = {p: False for p in PINOS_RELES}      # estado pedido pelo controle
+        self.reles_aplicados = {p: False for p in PINOS_RELES}   # estado de fato na placa (ou na simulação)
+        self.placa_pronta = True  # False da abertura da porta até a placa reiniciar e mandar o primeiro SOLO
+        self.ativo_aquecer = self.ativo_resfriar = self.ativo_umidificar = self.ativo_irrigar = False
+        self.running = True
+
+    def executar(self):
+        proximo = time.monotonic()
+        try:
+            while self.running:
+                self.processar_comandos()
+                if time.monotonic() >= proximo:
+                    self.passo()
+                    proximo += INTERVALO_CONTROLE
+                self.ler_serial()
+                self.publicar()
+                time.sleep(INTERVALO_COMANDOS)
+        finally:
+            for pino in PINOS_RELES: self.set_relay(pino, False)
+            self.registro_reles.fechar()
+            if self.serial: self.serial.close()
+            self.memoria.fechar()
+
+    def publicar(self):
+        self.memoria.publicar({
+            "temperatura": self.temperatura, "umidade_ar": self.umidade_ar,
+            "meta_temp": self.meta_temp, "meta_umid": self.meta_umid,
+            "solo": self.solo, "ciclos": self.loop_counter, "reles": self.reles_aplicados,
+            "simular": self.simular_sem_arduino, "status_porta": self.status_porta,
+            "seq_porta": self.seq_porta, "erro_porta": self.erro_porta
+        })
+
+    def processar_comandos(self):
+        while (dados := self.memoria.receber()) is not None:
+            cmd = dados[0]
+            if cmd == CMD_MANUAL:
+                _, a, r, u, i = CMD_FLAGS.unpack_from(dados)
+                self.ativo_aquecer, self.ativo_resfriar, self.ativo_umidificar, self.ativo_irrigar = map(bool, (a, r, u, i))
+            elif cmd == CMD_DEFINIR:
+                _, temp, umid = CMD_VALORES.unpack_from(dados)
+                if not math.isnan(temp): self.temperatura = temp
+                if not math.isnan(umid): self.umidade_ar = umid
+            elif cmd == CMD_PORTA:
+                porta = CMD_TEXTO.unpack_from(dados)[1].rstrip(b"\0").decode("utf-8", "ignore")
+                self.conectar_arduino(porta)
+            elif cmd == CMD_SAIR:
+                self.running = False
+
+    def conectar_arduino(self, porta):
+        if self.serial:
+            self.serial.close()
+            self.serial = None
+        self.buffer_serial = b""
+        self.erro_porta = ""
+        if not porta or "simul" in porta.lower():
+            self.simular_sem_arduino, self.status_porta = True, PORTA_SIMULADA
+        else:
+            try:
+                import serial
+                self.serial = serial.Serial(porta, 9600, timeout=0)   # leitura nunca espera
+                self.serial.reset_input_buffer()
+                self.simular_sem_arduino, self.status_porta = False, PORTA_SERIAL
+            except Exception as e:
+                self.simular_sem_arduino, self.status_porta, self.erro_porta = True, PORTA_ERRO, str(e)
+        # abrir a porta reinicia o Arduino, que desliga os relés e ignora comandos por uns 2 s:
+        # os relés só são reenviados quando ele mandar a primeira leitura (ver ler_serial)
+        self.placa_pronta = self.serial is None
+        for pino in PINOS_RELES: self._aplicar_rele(pino)
+        self.seq_porta += 1
+
+    def ler_serial(self):
+        if not self.serial: return
+        try:
+            # só o que já chegou; a linha incompleta fica no buffer para a próxima volta
+            n = self.serial.in_waiting
+            if not n: return
+            *linhas, self.buffer_serial = (self.buffer_serial + self.serial.read(n)).split(b"\n")
+            self.buffer_serial = self.buffer_serial[-MAX_LINHA_SERIAL:]
+        except Exception as e:
+            print(f"Erro na leitura serial: {e}", flush=True)
+            return
+        for linha in linhas:
+            linha = linha.decode("utf-8", "ignore").strip()
+            # formato enviado por estufa.cpp: "SOLO:valor1,valor2,valor3"
+            if linha.startswith("SOLO:"):
+                try:
+                    valores = [float(v) for v in linha[5:].split(",")]
+                except ValueError:
+                    continue
+                if len(valores) != 3: continue
+                self.solo = valores
+                if not self.placa_pronta:
+                    self.placa_pronta = True
+                    for pino in PINOS_RELES: self._aplicar_rele(pino)
+
+    def enviar_serial(self, pino, estado):
+        try:
+            self.serial.write(f"{COMANDOS_RELES[pino]} {'ON' if estado else 'OFF'}\n".encode())
+        except Exception as e:
+            print(f"Erro ao enviar comando para o pino {pino}: {e}", flush=True)
+
+    def set_relay(self, pino, estado):
+        self.relay_states[pino] = estado
+        self._aplicar_rele(pino)
+
+    def _aplicar_rele(self, pino):
+        # o log registra o que a placa de fato tem ligado: com a placa reiniciando, tudo desligado
+        estado = self.relay_states[pino] and self.placa_pronta
+        if self.reles_aplicados[pino] == estado: return
+        self.reles_aplicados[pino] = estado
+        self.registro_reles.registrar(pino, estado)
+        if pino == 10: self.ar_sim.set_pino10(estado)
+        if self.serial and self.placa_pronta: self.enviar_serial(pino, estado)
+
+    def any_manual_active(self):
+        return any([self.ativo_aquecer, self.ativo_resfriar, self.ativo_umidificar, self.ativo_irrigar])
+
+    def passo(self):
+        self.loop_counter += 1
+        modo_manual = self.any_manual_active()
+
+        # --- Lógica de Metas (Manual vs. Automático) ---
+        if modo_manual:
+            if self.loop_counter % 3 == 0: # Aplica o efeito a cada 3 segundos
+                if self.ativo_aquecer: self.meta_temp += 0.1
+                if self.ativo_resfriar: self.meta_temp -= 0.1
+                if self.ativo_umidificar: self.meta_umid += 0.1
+                if self.ativo_irrigar:
+                    self.meta_umid += 0.1
+                    self.ar_sim.irrigar_solo()
+        else: # modo automático
+            # Tende a voltar para o normal
+            self.meta_temp += (25.0 - self.meta_temp) * 0.01 + random.uniform(-0.02, 0.02)
+            self.meta_umid += (55.0 - self.meta_umid) * 0.01 + random.uniform(-0.05, 0.05)
+
+        # Limites de metas
+        self.meta_temp = min(max(10.0, self.meta_temp), 40.0)
+        self.meta_umid = min(max(20.0, self.meta_umid), 90.0)
+
+        # --- Simulação Física (Inércia) ---
+        self.temperatura += (self.meta_temp - self.temperatura) * 0.1 + random.uniform(-0.05, 0.05)
+        self.umidade_ar += (self.meta_umid - self.umidade_ar) * 0.1 + random.uniform(-0.1, 0.1)
+
+        # --- Relés acompanham os botões do modo manual ---
+        self.set_relay(7, self.ativo_aquecer)
+        self.set_relay(9, self.ativo_umidificar)
+        self.set_relay(10, self.ativo_irrigar)
+        self.set_relay(11, self.ativo_resfriar)
+
+        # Leitura de Sensores
+        if self.simular_sem_arduino: self.solo = list(self.ar_sim.ler_solo())
+        self.registro_reles.marcar_pulso()
+
+
+# ----------------- Run -----------------
+if __name__ == "__main__":
+    # a trava fica aberta até o processo terminar: garante um único núcleo por pasta
+    trava = open(ARQ_TRAVA_NUCLEO, "a+", encoding="utf-8")
+    limite = time.monotonic() + 1.0
+    while not _travar(trava):
+        if time.monotonic() > limite:
+            print("Núcleo já está em execução.", flush=True)
+            sys.exit(0)
+        time.sleep(0.1)
+    trava.seek(0)
+    trava.truncate()
+    trava.write(str(os.getpid()))
+    trava.flush()
+    nucleo = NucleoEstufa(MemoriaEstufa.criar())
+    signal.signal(signal.SIGTERM, lambda *_: setattr(nucleo, "running", False))
+    nucleo.executar()
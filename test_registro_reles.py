@@ -0,0 +1,136 @@
+import os
+import time
+
+import pytest
+
+from nucleo import EVENTO_RELE, RegistroReles, _dia, _meia_noite
+
+# uma data fixa longe de mudanças de horário de verão
+MEIA_NOITE = _meia_noite(time.mktime((2024, 3, 20, 12, 0, 0, 0, 0, -1)))
+
+
+@pytest.fixture
+def arquivos(tmp_path):
+    return {"arq_eventos": str(tmp_path / "reles.bin"),
+            "arq_agregados": str(tmp_path / "reles_agregados.jsonl"),
+            "arq_pulso": str(tmp_path / "reles_pulso.bin")}
+
+
+def conteudo(arquivos):
+    return {nome: open(path, "rb").read() if os.path.exists(path) else None for nome, path in arquivos.items()}
+
+
+def test_intervalo_atravessando_hora_e_dia(arquivos):
+    r = RegistroReles(**arquivos)
+    r.registrar(7, True, MEIA_NOITE - 1800)
+    r.registrar(7, False, MEIA_NOITE + 5400)
+    r.fechar()
+    r = RegistroReles(**arquivos)
+    horas = r.relatorio("hora", MEIA_NOITE - 3600, MEIA_NOITE + 3600)[7]
+    assert [(k, seg, n) for k, seg, n, _ in horas] == [
+        (MEIA_NOITE - 3600, 1800.0, 1), (MEIA_NOITE, 3600.0, 0), (MEIA_NOITE + 3600, 1800.0, 0)]
+    dias = r.relatorio("dia", MEIA_NOITE - 1, MEIA_NOITE + 1)[7]
+    assert [(k, seg, n) for k, seg, n, _ in dias] == [
+        (_dia(MEIA_NOITE - 1), 1800.0, 1), (_dia(MEIA_NOITE), 5400.0, 0)]
+    r.fechar()
+
+
+def test_janela_do_relatorio_alinhada_para_agregados_e_rele_aberto(arquivos):
+    r = RegistroReles(**arquivos)
+    r.registrar(7, True, MEIA_NOITE + 100)
+    r.registrar(7, False, MEIA_NOITE + 200)
+    r.registrar(9, True, MEIA_NOITE + 300)
+    r.ativo_ate = MEIA_NOITE + 1300
+    # inicio no meio do dia: os dois relés contam desde a meia-noite
+    tot = r.totais(MEIA_NOITE + 43200, MEIA_NOITE + 43200)
+    assert tot[7][:2] == (100.0, 1)
+    assert tot[9][:2] == (1000.0, 1)
+    r.fechar()
+
+
+def test_rele_aberto_fecha_no_ultimo_pulso_apos_queda(arquivos):
+    r = RegistroReles(**arquivos)
+    r.registrar(7, True, MEIA_NOITE + 100)
+    r.marcar_pulso(MEIA_NOITE + 700)
+    r.arq.close()   # núcleo morto sem fechar o registro
+    r.pulso.close()
+    r = RegistroReles(**arquivos)
+    assert r.ligado_desde == {}
+    assert r.totais(MEIA_NOITE)[7][:2] == (600.0, 1)
+    r.fechar()
+
+
+def test_somente_leitura_nao_altera_arquivos(arquivos):
+    r = RegistroReles(**arquivos)
+    r.registrar(7, True, MEIA_NOITE + 100)
+    r.marcar_pulso(MEIA_NOITE + 400)
+    r.arq.write(b"\x01\x02\x03")   # evento gravado pela metade
+    r.arq.flush()
+    antes = conteudo(arquivos)
+    leitura = RegistroReles(somente_leitura=True, **arquivos)
+    assert conteudo(arquivos) == antes
+    assert leitura.totais(MEIA_NOITE)[7][:2] == (300.0, 1)
+    leitura.registrar(7, False, MEIA_NOITE + 500)
+    leitura.marcar_pulso(MEIA_NOITE + 500)
+    leitura.fechar()
+    assert conteudo(arquivos) == antes
+    r.arq.close()
+    r.pulso.close()
+
+
+def test_evento_pela_metade_descartado_pelo_gravador(arquivos):
+    r = RegistroReles(**arquivos)
+    r.registrar(7, True, MEIA_NOITE + 100)
+    r.registrar(7, False, MEIA_NOITE + 200)
+    r.arq.write(b"\x01\x02\x03")
+    r.fechar()
+    r = RegistroReles(**arquivos)
+    assert os.path.getsize(arquivos["arq_eventos"]) == 2 * EVENTO_RELE.size
+    assert r.posicao == 2 * EVENTO_RELE.size
+    r.registrar(9, True, MEIA_NOITE + 300)
+    r.registrar(9, False, MEIA_NOITE + 400)
+    r.fechar()
+    r = RegistroReles(**arquivos)
+    assert {p: t[:2] for p, t in r.totais(MEIA_NOITE).items()} == {7: (100.0, 1), 9: (100.0, 1)}
+    r.fechar()
+
+
+def test_diario_reaplicado_e_compactado(arquivos):
+    r = RegistroReles(**arquivos)
+    for i in range(3):
+        # cada evento mais de uma hora depois do salvamento anterior gera uma linha no diário
+        r.registrar(7, True, MEIA_NOITE + i * 7200)
+        r.registrar(7, False, MEIA_NOITE + i * 7200 + 60)
+    r.fechar()
+    with open(arquivos["arq_agregados"], "a", encoding="utf-8") as f:
+        f.write('{"posicao": 4')   # linha gravada pela metade
+    r = RegistroReles(**arquivos)
+    assert r.totais(MEIA_NOITE)[7][:2] == (180.0, 3)
+    with open(arquivos["arq_agregados"], encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
+    r.fechar()
+
+
+def test_log_menor_que_a_posicao_do_diario(arquivos):
+    r = RegistroReles(**arquivos)
+    r.registrar(7, True, MEIA_NOITE + 100)
+    r.registrar(7, False, MEIA_NOITE + 200)
+    r.fechar()
+    # o último registro do diário aponta além do fim do log e é ignorado: fica o anterior,
+    # com o relé ainda ligado, e a abertura o encerra no último salvamento
+    with open(arquivos["arq_eventos"], "r+b") as f:
+        f.truncate(EVENTO_RELE.size)
+    r = RegistroReles(**arquivos)
+    assert r.ligado_desde == {}
+    assert r.posicao == os.path.getsize(arquivos["arq_eventos"]) == 2 * EVENTO_RELE.size
+    assert r.totais(MEIA_NOITE)[7][:2] == (0.0, 1)
+    r.fechar()
+
+
+def test_segundo_gravador_recusado(arquivos):
+    r = RegistroReles(**arquivos)
+    with pytest.raises(RuntimeError):
+        RegistroReles(**arquivos)
+    RegistroReles(somente_leitura=True, **arquivos)
+    r.fechar()
+    RegistroReles(**arquivos).fechar()